@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""Microbenchmarks for the dictionary and game-logic hot paths.
+
+Each benchmark runs on fixed racks (6-letter words from csw.txt) and fixed
+seeds, and reports the best per-call time over several repeats.
+
+    python benchmark.py --save bench_baseline.json
+    python benchmark.py --compare bench_baseline.json --threshold 10
+
+--compare exits 1 if any benchmark is more than --threshold percent slower
+than the baseline, or if a benchmark in the baseline did not run.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import time
+
+from dictionary import Dictionary, dictionary
+from game import (
+    generate_letters,
+    validate_submission,
+    format_game_message,
+    format_results_message,
+)
+from models import GameSession, GameMode
+
+RACKS = ["MASTER", "ORANGE", "PLANET", "STRIDE", "BOUNCE"]
+SEED = 1234
+
+
+def _session(rack, players=4):
+    session = GameSession(chat_id=1, mode=GameMode.MULTI, host_user_id=1)
+    session.letters = list(rack)
+    session.start()
+    session.possible_words = dictionary.find_possible_words(session.letters)
+    rng = random.Random(SEED)
+    for user_id in range(1, players + 1):
+        player = session.add_player(user_id, "", "Player %d" % user_id)
+        for word in rng.sample(session.possible_words, min(8, len(session.possible_words))):
+            player.add_word(word)
+        player.current_input = rack[:3]
+        player.used_positions = {0, 1, 2}
+        player.input_positions = [0, 1, 2]
+        player.last_action = "+300 pts for %s!" % rack[:3]
+    return session
+
+
+def bench_load():
+    d = Dictionary.__new__(Dictionary)
+
+    def run():
+        d._words = set()
+        d._words_by_length = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            d._load()
+    return run, 1
+
+
+def bench_is_valid_word():
+    words = [w for rack in RACKS for w in (rack, rack[::-1], rack[:3], rack[:4])]
+    def run():
+        for w in words:
+            dictionary.is_valid_word(w)
+    return run, len(words)
+
+
+def bench_can_form_word():
+    cases = [(w, list(rack)) for rack in RACKS for w in (rack, rack[::-1], rack[:4] + "Q")]
+    def run():
+        for w, letters in cases:
+            dictionary.can_form_word(w, letters)
+    return run, len(cases)
+
+
+def bench_find_possible_words():
+    racks = [list(r) for r in RACKS]
+    def run():
+        for letters in racks:
+            dictionary.find_possible_words(letters)
+    return run, len(racks)
+
+
+def bench_count_possible_words():
+    racks = [list(r) for r in RACKS]
+    def run():
+        for letters in racks:
+            dictionary.count_possible_words(letters)
+    return run, len(racks)
+
+
+def bench_generate_letters():
+    def run():
+        generate_letters(random.Random(SEED))
+    return run, 1
+
+
+def bench_validate_submission():
+    sessions = [_session(rack, players=1) for rack in RACKS]
+    cases = []
+    for session in sessions:
+        player = session.get_player(1)
+        player.found_words.clear()
+        for word in session.possible_words[:10] + ["QQQ", session.letters[0] * 2 + "Z"]:
+            cases.append((player, word, session))
+
+    def run():
+        for player, word, session in cases:
+            validate_submission(player, word, session)
+        for session in sessions:
+            player = session.get_player(1)
+            player.found_words.clear()
+            player.score = 0
+    return run, len(cases)
+
+
+def bench_format_game_message():
+    cases = [(s, p) for s in (_session(rack) for rack in RACKS) for p in s.players.values()]
+    def run():
+        for session, player in cases:
+            format_game_message(session, player)
+    return run, len(cases)
+
+
+def bench_format_results_message():
+    sessions = [_session(rack) for rack in RACKS]
+    def run():
+        for session in sessions:
+            format_results_message(session)
+    return run, len(sessions)
+
+
+def bench_build_game_keyboard():
+    from keyboard import build_game_keyboard
+    cases = [(list(rack), set(range(i % 7)), "1a.%x" % i) for i, rack in enumerate(RACKS * 4)]
+    def run():
+        for letters, used, tag in cases:
+            build_game_keyboard(letters, used, tag)
+    return run, len(cases)
+
+
+BENCHMARKS = {
+    "Dictionary._load": bench_load,
+    "is_valid_word": bench_is_valid_word,
+    "can_form_word": bench_can_form_word,
+    "find_possible_words": bench_find_possible_words,
+    "count_possible_words": bench_count_possible_words,
+    "generate_letters": bench_generate_letters,
+    "validate_submission": bench_validate_submission,
+    "format_game_message": bench_format_game_message,
+    "format_results_message": bench_format_results_message,
+    "build_game_keyboard": bench_build_game_keyboard,
+}
+
+
+def measure(setup, repeat=5, min_time=0.2):
+    """Best seconds per call over repeat rounds of at least min_time each."""
+    run, calls = setup()
+    run()  # warm up
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        if time.perf_counter() - start >= min_time:
+            break
+        loops *= 2
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        best = min(best, (time.perf_counter() - start) / (loops * calls))
+    return best
+
+
+def run_all(names, repeat, min_time):
+    results = {}
+    for name in names:
+        try:
+            results[name] = measure(BENCHMARKS[name], repeat, min_time)
+        except ImportError as e:
+            print("%-24s skipped (%s)" % (name, e))
+            continue
+        print("%-24s %12.2f us" % (name, results[name] * 1e6))
+    return results
+
+
+def compare(results, baseline, threshold, names):
+    """Print the change against baseline. Returns the names that regressed or did not run."""
+    regressed = []
+    for name in names:
+        if name in baseline and name not in results:
+            regressed.append(name)
+            print("%-24s %12.2f us -> %12s  MISSING" % (name, baseline[name] * 1e6, "not run"))
+    for name, seconds in results.items():
+        if name not in baseline:
+            continue
+        change = (seconds / baseline[name] - 1) * 100
+        flag = ""
+        if change > threshold:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        print("%-24s %12.2f us -> %12.2f us  %+7.1f%%%s" % (
+            name, baseline[name] * 1e6, seconds * 1e6, change, flag))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot-path microbenchmarks")
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="allowed slowdown in percent for --compare")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run a subset")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="minimum seconds per measured round")
+    args = parser.parse_args()
+
+    names = args.only or list(BENCHMARKS)
+    results = run_all(names, args.repeat, args.min_time)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print()
+        regressed = compare(results, baseline, args.threshold, names)
+        if regressed:
+            print("\n%d regression(s) over %.0f%% or missing: %s" % (
+                len(regressed), args.threshold, ", ".join(regressed)))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,40 @@
 """Telegram Anagram Bot."""
 
 import logging
+import random
+import threading
+import time
+from collections import Counter
 from typing import Dict
 
 from telegram import Update, CallbackQuery
+from telegram.request import HTTPXRequest
 from telegram.ext import (
     Application,
     CommandHandler,
     CallbackQueryHandler,
+    MessageHandler,
+    TypeHandler,
     ContextTypes,
+    filters,
 )
 
-from config import BOT_TOKEN, GAME_DURATION
+from config import (
+    BOT_TOKEN, GAME_DURATION, TEXT_INPUT_ENABLED, LEADERBOARD_FLUSH_INTERVAL, METRICS_PORT,
+    USER_TAP_RATE, USER_TAP_BURST, CHAT_TAP_RATE, CHAT_TAP_BURST,
+    PROFILE_SECONDS, PROFILE_RATE_HZ, PROFILE_MAX_SECONDS, PROFILE_DIR, ADMIN_USER_IDS,
+    RECORD_UPDATES_PATH,
+)
 from models import GameSession, GameMode, GameState
 from game import (
     generate_letters,
     validate_submission,
+    validate_submissions,
+    parse_word_batch,
     format_game_message,
     format_results_message,
     format_waiting_message,
+    format_leaderboard_message,
 )
 from keyboard import (
     build_game_keyboard,
@@ -27,16 +43,69 @@ from keyboard import (
     CB_RESTORE,
     CB_BACKSPACE,
     CB_SUBMIT,
+    CB_JOIN,
+    CB_BEGIN,
 )
 from dictionary import dictionary
-
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
+from leaderboard import Leaderboard, GLOBAL_SCOPE
+from ratelimit import RateLimiter
+from metrics import (
+    CALLBACK_LATENCY,
+    CALLBACKS_DROPPED,
+    API_LATENCY,
+    API_ERRORS,
+    API_RATE_LIMITED,
+    ACTIVE_SESSIONS,
+    SESSION_PLAYERS,
+    start_metrics_server,
 )
+from profiler import start_profiling
+from replay import UpdateRecorder, STALE_MARK
+from logsetup import setup_logging
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
 active_games: Dict[int, GameSession] = {}
+user_tap_limiter = RateLimiter(USER_TAP_RATE, USER_TAP_BURST)
+chat_tap_limiter = RateLimiter(CHAT_TAP_RATE, CHAT_TAP_BURST)
+leaderboard = Leaderboard()
+# Rack generator; replay.py swaps in a seeded random.Random
+letters_rng = random
+recorder = UpdateRecorder(RECORD_UPDATES_PATH) if RECORD_UPDATES_PATH else None
+# The event loop runs in the thread that calls main()
+loop_thread_id = threading.get_ident()
+
+CALLBACK_ACTIONS = {
+    CB_LETTER: "letter",
+    CB_RESTORE: "restore",
+    CB_BACKSPACE: "backspace",
+    CB_SUBMIT: "submit",
+}
+
+ACTIVE_SESSIONS.set_function(lambda: {
+    (state.value,): n for state, n in Counter(s.state for s in list(active_games.values())).items()
+})
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest that records Bot API latency, errors and 429s per method."""
+
+    async def do_request(self, url, method, *args, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        start = time.perf_counter()
+        try:
+            code, payload = await super().do_request(url, method, *args, **kwargs)
+        except Exception:
+            API_ERRORS.inc(api_method)
+            raise
+        finally:
+            API_LATENCY.observe(time.perf_counter() - start, api_method)
+        if code == 429:
+            API_RATE_LIMITED.inc(api_method)
+        if code >= 400:
+            API_ERRORS.inc(api_method)
+        return code, payload
 
 
 def get_display_name(user):
@@ -50,7 +119,8 @@ async def send_game_keyboard(context, chat_id, session, user_id):
     if not player:
         return 0
     text = format_game_message(session, player)
-    keyboard = build_game_keyboard(session.letters, player.used_positions)
+    tag = player.next_keyboard_tag(session.session_id)
+    keyboard = build_game_keyboard(session.letters, player.used_positions, tag)
     msg = await context.bot.send_message(chat_id=chat_id, text=text, reply_markup=keyboard)
     player.message_id = msg.message_id
     return msg.message_id
@@ -61,13 +131,17 @@ async def update_player_message(context, chat_id, session, user_id):
     if not player or not player.message_id:
         return
     text = format_game_message(session, player)
-    keyboard = build_game_keyboard(session.letters, player.used_positions)
+    previous_tag = player.keyboard_tag
+    tag = player.next_keyboard_tag(session.session_id)
+    keyboard = build_game_keyboard(session.letters, player.used_positions, tag)
     try:
         await context.bot.edit_message_text(
             chat_id=chat_id, message_id=player.message_id,
             text=text, reply_markup=keyboard,
         )
     except Exception as e:
+        # The old keyboard is still on screen, keep accepting its taps
+        player.keyboard_tag = previous_tag
         if "Message is not modified" not in str(e):
             logger.warning("Failed to update message: %s", e)
 
@@ -90,17 +164,21 @@ async def end_game(context, chat_id):
                 pass
     results = format_results_message(session)
     await context.bot.send_message(chat_id=chat_id, text=results)
+    leaderboard.record_game(session)
     del active_games[chat_id]
 
 
 async def timer_callback(context):
     chat_id = context.job.data
+    if recorder:
+        recorder.record("t", chat_id, 0)
     await end_game(context, chat_id)
 
 
 async def start_game_session(context, session):
-    session.letters = generate_letters()
+    session.letters = generate_letters(letters_rng)
     session.start()
+    SESSION_PLAYERS.observe(len(session.players))
     session.possible_words = dictionary.find_possible_words(session.letters)
     logger.info("Game started in chat %s: letters=%s, possible=%d",
                 session.chat_id, session.letters, len(session.possible_words))
@@ -113,14 +191,20 @@ async def start_game_session(context, session):
 
 
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Typed words only reach the bot in private chats unless group privacy
+    # mode has been disabled, so only advertise them where they always work
+    text_rule = ""
+    if TEXT_INPUT_ENABLED and update.effective_chat.type == "private":
+        text_rule = "  - You can also type words, several per message\n"
     msg = ("Welcome to the Anagram Game!\n\n"
            "You have 60 seconds to find as many words as possible "
            "from 6 random letters!\n\n"
            "Rules:\n"
            "  - Words must be 3-6 letters\n"
            "  - Each letter can only be used once per word\n"
-           "  - Find as many words as you can before time runs out!\n\n"
-           "Scoring:\n"
+           "  - Find as many words as you can before time runs out!\n"
+           + text_rule +
+           "\nScoring:\n"
            "  3 letters = 300 pts\n"
            "  4 letters = 400 pts\n"
            "  5 letters = 500 pts\n"
@@ -128,6 +212,7 @@ async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
            "Commands:\n"
            "  /play  - Start a solo game\n"
            "  /multi - Create a multiplayer game\n"
+           "  /top   - Chat leaderboard (/top global for all chats)\n"
            "  /help  - Show this message")
     await update.message.reply_text(msg)
 
@@ -163,15 +248,82 @@ async def cmd_multi(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(text, reply_markup=keyboard)
 
 
+async def cmd_top(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if context.args and context.args[0].lower() == "global":
+        text = format_leaderboard_message(leaderboard.top(GLOBAL_SCOPE), "GLOBAL LEADERBOARD")
+    else:
+        text = format_leaderboard_message(leaderboard.top(update.effective_chat.id), "LEADERBOARD")
+    await update.message.reply_text(text)
+
+
+async def cmd_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id not in ADMIN_USER_IDS:
+        return
+    seconds = PROFILE_SECONDS or 30
+    if context.args and context.args[0].isdigit():
+        seconds = int(context.args[0])
+    seconds = max(1, min(seconds, PROFILE_MAX_SECONDS))
+    path = start_profiling(loop_thread_id, PROFILE_RATE_HZ, seconds, PROFILE_DIR)
+    if path is None:
+        await update.message.reply_text("A profile is already being recorded.")
+        return
+    await update.message.reply_text("Profiling for %ds, writing %s" % (seconds, path))
+
+
+async def flush_stores(context):
+    leaderboard.flush()
+    if recorder:
+        recorder.flush()
+
+
+async def close_stores(app):
+    leaderboard.close()
+    if recorder:
+        recorder.close()
+
+
+async def record_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Append an inbound update to the replay log before any handler runs."""
+    if not update.effective_chat or not update.effective_user:
+        return
+    chat_id = update.effective_chat.id
+    user_id = update.effective_user.id
+    query = update.callback_query
+    if query and query.data:
+        data = query.data
+        if data not in (CB_JOIN, CB_BEGIN):
+            session = active_games.get(chat_id)
+            player = session.get_player(user_id) if session else None
+            fresh = player is not None and data[2:] == player.keyboard_tag
+            data = data[:2] if fresh else data[:2] + STALE_MARK
+        recorder.record("c", chat_id, user_id, data)
+    elif update.message and update.message.text:
+        # Only commands and word batches; other chat text is never written
+        text = update.message.text
+        if text.startswith("/"):
+            recorder.record("m", chat_id, user_id, text)
+        elif TEXT_INPUT_ENABLED:
+            session = active_games.get(chat_id)
+            words = parse_word_batch(text)
+            if words and session and session.is_playing and session.get_player(user_id):
+                recorder.record("m", chat_id, user_id, " ".join(words))
+
+
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    start = time.perf_counter()
     query = update.callback_query
     data = query.data
     chat_id = update.effective_chat.id
     user = update.effective_user
-    if data == "action:join":
+    if not (user_tap_limiter.allow(user.id) and chat_tap_limiter.allow(chat_id)):
+        # Flooding: acknowledge so the client stops spinning, but do no work
+        CALLBACKS_DROPPED.inc("flood")
+        await query.answer()
+        return
+    if data == CB_JOIN:
         await handle_join(query, context, chat_id, user)
         return
-    if data == "action:begin":
+    if data == CB_BEGIN:
         await handle_begin(query, context, chat_id, user)
         return
     session = active_games.get(chat_id)
@@ -182,32 +334,32 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not player:
         await query.answer("You are not in this game!")
         return
-    if data.startswith(CB_LETTER):
-        # format: letter:<position>:<letter>
-        parts = data[len(CB_LETTER):].split(":")
-        position = int(parts[0])
-        letter = parts[1]
-        if position in player.used_positions:
-            # Stale callback from cached keyboard, treat as restore
-            await handle_restore(query, context, chat_id, session, player, position)
-        else:
-            await handle_letter_press(query, context, chat_id, session, player, letter, position)
-    elif data.startswith(CB_RESTORE):
-        # format: restore:<position>:<letter>
-        parts = data[len(CB_RESTORE):].split(":")
-        position = int(parts[0])
-        letter = parts[1]
-        if position in player.used_positions:
-            await handle_restore(query, context, chat_id, session, player, position)
-        else:
-            # Position already restored (e.g. after submit), treat as letter press
-            await handle_letter_press(query, context, chat_id, session, player, letter, position)
-    elif data == CB_BACKSPACE:
+    # format: <op><position><tag>; a tag mismatch means a keyboard from an
+    # earlier game or an already replaced render, drop it before touching state
+    if data[2:] != player.keyboard_tag:
+        CALLBACKS_DROPPED.inc("stale")
+        await query.answer()
+        return
+    op = data[0]
+    if op == CB_LETTER:
+        position = ord(data[1]) - 48
+        await handle_letter_press(query, context, chat_id, session, player,
+                                  session.letters[position], position)
+    elif op == CB_RESTORE:
+        await handle_restore(query, context, chat_id, session, player, ord(data[1]) - 48)
+    elif op == CB_BACKSPACE:
         await handle_backspace(query, context, chat_id, session, player)
-    elif data == CB_SUBMIT:
+    elif op == CB_SUBMIT:
         await handle_submit(query, context, chat_id, session, player)
     else:
         await query.answer("Unknown action")
+        return
+    latency = time.perf_counter() - start
+    CALLBACK_LATENCY.observe(latency, CALLBACK_ACTIONS[op])
+    logger.info("callback handled", extra={
+        "chat_id": chat_id, "action": CALLBACK_ACTIONS[op],
+        "latency_ms": round(latency * 1000, 2), "sampled": True,
+    })
 
 
 async def handle_join(query, context, chat_id, user):
@@ -264,6 +416,9 @@ async def handle_restore(query, context, chat_id, session, player, position):
     if session.time_remaining <= 0:
         await query.answer("Time is up!")
         return
+    if position not in player.used_positions:
+        await query.answer()
+        return
     player.restore_position(position)
     player.last_action = ""
     await query.answer()
@@ -295,13 +450,70 @@ async def handle_submit(query, context, chat_id, session, player):
     await update_player_message(context, chat_id, session, player.user_id)
 
 
-def main():
-    app = Application.builder().token(BOT_TOKEN).build()
+async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Submit one or more space-separated words typed as a chat message."""
+    if not update.message or not update.effective_user:
+        return
+    chat_id = update.effective_chat.id
+    user = update.effective_user
+    session = active_games.get(chat_id)
+    if not session or not session.is_playing:
+        return
+    player = session.get_player(user.id)
+    if not player or session.time_remaining <= 0:
+        return
+    words = parse_word_batch(update.message.text)
+    if not words:
+        return
+    total, messages = validate_submissions(player, words, session)
+    if len(messages) > 1:
+        player.last_action = "+%d pts total | %s" % (total, " | ".join(messages))
+    else:
+        player.last_action = messages[0]
+    await update_player_message(context, chat_id, session, player.user_id)
+
+
+def build_application(token=BOT_TOKEN, base_url=None):
+    """Build the Application with all handlers; base_url points it at another Bot API."""
+    builder = (
+        Application.builder()
+        .token(token)
+        .request(InstrumentedRequest(connection_pool_size=256))
+        .get_updates_request(InstrumentedRequest())
+        .post_shutdown(close_stores)
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    app = builder.build()
+    if recorder:
+        app.add_handler(TypeHandler(Update, record_update), group=-1)
     app.add_handler(CommandHandler("start", cmd_start))
     app.add_handler(CommandHandler("help", cmd_help))
     app.add_handler(CommandHandler("play", cmd_play))
     app.add_handler(CommandHandler("multi", cmd_multi))
+    app.add_handler(CommandHandler("top", cmd_top))
+    app.add_handler(CommandHandler("profile", cmd_profile))
     app.add_handler(CallbackQueryHandler(handle_callback))
+    if TEXT_INPUT_ENABLED:
+        app.add_handler(MessageHandler(
+            filters.UpdateType.MESSAGE & filters.TEXT & ~filters.COMMAND, handle_text))
+    app.job_queue.run_repeating(flush_stores, interval=LEADERBOARD_FLUSH_INTERVAL)
+    return app
+
+
+def main():
+    app = build_application()
+    if METRICS_PORT:
+        try:
+            start_metrics_server(METRICS_PORT)
+            logger.info("Metrics on http://127.0.0.1:%d/metrics", METRICS_PORT)
+        except OSError as e:
+            # Observability must never keep the bot from starting
+            logger.warning("Metrics endpoint disabled, port %d unavailable: %s", METRICS_PORT, e)
+    if PROFILE_SECONDS > 0:
+        seconds = min(PROFILE_SECONDS, PROFILE_MAX_SECONDS)
+        path = start_profiling(loop_thread_id, PROFILE_RATE_HZ, seconds, PROFILE_DIR)
+        logger.info("Profiling for %ds, writing %s", seconds, path)
     logger.info("Bot starting...")
     app.run_polling(allowed_updates=Update.ALL_TYPES, drop_pending_updates=True)
 
@@ -3,8 +3,15 @@ import os
 # Telegram Bot Token - set via environment variable or replace here
 BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "YOUR_BOT_TOKEN_HERE")
 
+# Logging: level, optional file (stderr otherwise), "text" or "json" lines, and
+# how many per-tap records share one logged sample
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_FILE = os.environ.get("LOG_FILE", "")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+LOG_SAMPLE_EVERY = int(os.environ.get("LOG_SAMPLE_EVERY", "100"))
+
 # Game settings
-GAME_DURATION = 60  # seconds
+GAME_DURATION = int(os.environ.get("GAME_DURATION", "60"))  # seconds
 NUM_LETTERS = 6
 MIN_VOWELS = 2
 MAX_VOWELS = 3
@@ -17,12 +24,48 @@ SCORE_MAP = {
     6: 600,
 }
 
+# Inbound callback flood control (taps per second, burst size)
+USER_TAP_RATE = 8
+USER_TAP_BURST = 12
+CHAT_TAP_RATE = 30
+CHAT_TAP_BURST = 45
+
+# Local Prometheus /metrics endpoint, 0 disables it
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9108"))
+
+# Sampling profiler: PROFILE_SECONDS > 0 profiles that long after startup;
+# admins can also open a window with /profile [seconds]
+PROFILE_SECONDS = int(os.environ.get("PROFILE_SECONDS", "0"))
+PROFILE_RATE_HZ = int(os.environ.get("PROFILE_RATE_HZ", "100"))
+PROFILE_MAX_SECONDS = 300
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(os.path.dirname(__file__), "profiles"))
+ADMIN_USER_IDS = {int(x) for x in os.environ.get("ADMIN_USER_IDS", "").split(",") if x.strip()}
+
+# Append the inbound update stream to this file for replay.py (empty disables)
+RECORD_UPDATES_PATH = os.environ.get("RECORD_UPDATES", "")
+
 # Minimum word length
 MIN_WORD_LENGTH = 3
 
+# Typed-text submissions: players may send words as a chat message instead of
+# tapping letters. Off by default; enable with TEXT_INPUT=1. While enabled, any
+# all-letters message from a player during a game is scored.
+# Groups: bots have privacy mode on by default and never see plain messages, so
+# for /multi games it must be disabled via @BotFather (/setprivacy).
+TEXT_INPUT_ENABLED = os.environ.get("TEXT_INPUT", "0") == "1"
+MAX_WORDS_PER_MESSAGE = 20
+
 # Dictionary file path
 DICTIONARY_PATH = os.path.join(os.path.dirname(__file__), "data", "csw.txt")
 
+# Leaderboard store
+LEADERBOARD_PATH = os.environ.get(
+    "LEADERBOARD_PATH", os.path.join(os.path.dirname(__file__), "data", "leaderboard.db")
+)
+LEADERBOARD_TOP_K = 10
+LEADERBOARD_BATCH_SIZE = 100
+LEADERBOARD_FLUSH_INTERVAL = 30  # seconds
+
 # Vowels and consonants
 VOWELS = list("AEIOU")
 CONSONANTS = list("BCDFGHJKLMNPQRSTVWXYZ")
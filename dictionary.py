@@ -1,8 +1,10 @@
 """Dictionary loading and word validation for the Anagram game."""
 
+import time
 from collections import Counter
 from typing import Set, List
 from config import DICTIONARY_PATH, MIN_WORD_LENGTH, NUM_LETTERS
+from metrics import FIND_WORDS_SECONDS
 
 
 class Dictionary:
@@ -47,13 +49,16 @@ class Dictionary:
 
         Each letter can only be used once per word.
         """
+        start = time.perf_counter()
         available_count = Counter(l.upper() for l in letters)
         possible = []
         for word in self._words:
             word_count = Counter(word)
             if all(word_count[c] <= available_count.get(c, 0) for c in word_count):
                 possible.append(word)
-        return sorted(possible, key=lambda w: (len(w), w))
+        possible.sort(key=lambda w: (len(w), w))
+        FIND_WORDS_SECONDS.observe(time.perf_counter() - start)
+        return possible
 
     def count_possible_words(self, letters: List[str]) -> int:
         """Count how many valid words can be formed from the given letters."""
@@ -0,0 +1,214 @@
+"""Local fake Telegram Bot API server for load testing.
+
+Implements the handful of methods the bot uses (getMe, getUpdates,
+setWebhook/deleteWebhook, sendMessage, editMessageText, answerCallbackQuery)
+over a minimal asyncio HTTP/1.1 server, and rejects sendMessage and
+editMessageText with 429 once Telegram's documented limits are exceeded:
+about 1 message/s per chat (with short bursts allowed), 20 messages/minute per
+group (negative chat ids) and 30 messages/s overall.
+
+Updates are injected with push_update(); listeners registered with
+add_listener() see every message the bot sends or edits.
+"""
+
+import asyncio
+import http
+import itertools
+import json
+import time
+from collections import Counter
+from typing import Callable, Dict, List
+from urllib.parse import parse_qsl
+
+from ratelimit import RateLimiter
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Anagram", "username": "anagram_load_bot"}
+RATE_LIMITED_METHODS = ("sendMessage", "editMessageText")
+
+
+class FakeBotAPI:
+    """In-memory Bot API with long polling and send/edit rate limits."""
+
+    def __init__(self, chat_rate=1.0, chat_burst=10, group_rate=20 / 60.0, group_burst=20,
+                 global_rate=30.0, global_burst=30):
+        self.chat_limiter = RateLimiter(chat_rate, chat_burst)
+        self.group_limiter = RateLimiter(group_rate, group_burst)
+        self.global_limiter = RateLimiter(global_rate, global_burst)
+        self.calls: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+        self.messages: Dict[tuple, dict] = {}
+        self._updates: List[dict] = []
+        self._update_ids = itertools.count(1)
+        self._message_ids: Dict[int, itertools.count] = {}
+        self._callback_ids = itertools.count(1)
+        self._new_updates = asyncio.Condition()
+        self._listeners: List[Callable[[str, dict], None]] = []
+        self._server = None
+        self._connections = set()
+
+    # Update injection
+
+    async def push_update(self, update):
+        update["update_id"] = next(self._update_ids)
+        async with self._new_updates:
+            self._updates.append(update)
+            self._new_updates.notify_all()
+        return update["update_id"]
+
+    def command_update(self, chat_id, user, text):
+        command = text.split()[0]
+        return {"message": {
+            "message_id": self._next_message_id(chat_id), "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "group", "title": "load %d" % chat_id},
+            "from": user, "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+        }}
+
+    def callback_update(self, message, user, data):
+        return {"callback_query": {
+            "id": str(next(self._callback_ids)), "from": user,
+            "chat_instance": str(message["chat"]["id"]), "data": data,
+            "message": {k: message[k] for k in ("message_id", "date", "chat", "text")},
+        }}
+
+    def add_listener(self, listener):
+        """listener(method, message) is called for every sent or edited message."""
+        self._listeners.append(listener)
+
+    # Bot API methods
+
+    def _next_message_id(self, chat_id):
+        ids = self._message_ids.get(chat_id)
+        if ids is None:
+            ids = self._message_ids[chat_id] = itertools.count(1)
+        return next(ids)
+
+    async def _get_updates(self, params):
+        offset = int(params.get("offset") or 0)
+        timeout = float(params.get("timeout") or 0)
+        self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates and timeout > 0:
+            async with self._new_updates:
+                try:
+                    await asyncio.wait_for(self._new_updates.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        limit = int(params.get("limit") or 100)
+        return self._updates[:limit]
+
+    def _send_message(self, params):
+        chat_id = int(params["chat_id"])
+        message = {
+            "message_id": self._next_message_id(chat_id), "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "group", "title": "load %d" % chat_id},
+            "from": BOT_USER, "text": params.get("text", ""),
+        }
+        if params.get("reply_markup"):
+            message["reply_markup"] = params["reply_markup"]
+        self.messages[(chat_id, message["message_id"])] = message
+        return message
+
+    def _edit_message_text(self, params):
+        key = (int(params["chat_id"]), int(params["message_id"]))
+        message = self.messages.get(key)
+        if message is None:
+            raise LookupError("Bad Request: message to edit not found")
+        message["text"] = params.get("text", "")
+        message["edit_date"] = int(time.time())
+        # As in Telegram, an edit without reply_markup removes the keyboard
+        if params.get("reply_markup"):
+            message["reply_markup"] = params["reply_markup"]
+        else:
+            message.pop("reply_markup", None)
+        return message
+
+    async def call(self, method, params):
+        """Dispatch one API call. Returns (http_status, response_body)."""
+        self.calls[method] += 1
+        if method in RATE_LIMITED_METHODS:
+            chat_id = int(params.get("chat_id") or 0)
+            if not (self.chat_limiter.allow(chat_id)
+                    and (chat_id >= 0 or self.group_limiter.allow(chat_id))
+                    and self.global_limiter.allow(None)):
+                self.rate_limited[method] += 1
+                return 429, {"ok": False, "error_code": 429,
+                             "description": "Too Many Requests: retry after 1",
+                             "parameters": {"retry_after": 1}}
+        try:
+            if method == "getUpdates":
+                result = await self._get_updates(params)
+            elif method == "getMe":
+                result = BOT_USER
+            elif method in ("setWebhook", "deleteWebhook", "answerCallbackQuery"):
+                result = True
+            elif method == "sendMessage":
+                result = self._send_message(params)
+            elif method == "editMessageText":
+                result = self._edit_message_text(params)
+            else:
+                return 404, {"ok": False, "error_code": 404, "description": "Not Found"}
+        except LookupError as e:
+            return 400, {"ok": False, "error_code": 400, "description": str(e)}
+        if method in RATE_LIMITED_METHODS:
+            for listener in self._listeners:
+                listener(method, result)
+        return 200, {"ok": True, "result": result}
+
+    # HTTP plumbing
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Pending getUpdates long polls would otherwise be cancelled noisily
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                _, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, payload = await self.call(path.rsplit("/", 1)[-1],
+                                                  _parse_params(headers, body))
+                data = json.dumps(payload).encode("utf-8")
+                head = "HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n" % (
+                    status, http.HTTPStatus(status).phrase, len(data))
+                writer.write(head.encode("latin-1") + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+
+def _parse_params(headers, body):
+    """Decode form or JSON parameters; JSON-encoded form values are expanded."""
+    if not body:
+        return {}
+    if headers.get("content-type", "").startswith("application/json"):
+        return json.loads(body)
+    params = {}
+    for key, value in parse_qsl(body.decode("utf-8"), keep_blank_values=True):
+        if value[:1] in ("{", "["):
+            value = json.loads(value)
+        params[key] = value
+    return params
@@ -1,27 +1,38 @@
 """Core game logic for the Anagram game."""
 
 import random
+import time
 from typing import List, Tuple
 
-from config import VOWELS, CONSONANTS, NUM_LETTERS, MIN_VOWELS, MAX_VOWELS, SCORE_MAP
+from config import (
+    VOWELS, CONSONANTS, NUM_LETTERS, MIN_VOWELS, MAX_VOWELS, SCORE_MAP,
+    MAX_WORDS_PER_MESSAGE,
+)
 from dictionary import dictionary
+from metrics import LETTERS_ATTEMPTS, LETTERS_SECONDS
 from models import GameSession, Player
 
 
-def generate_letters():
+def generate_letters(rng=random):
+    """Draw a rack with enough possible words; rng may be a seeded random.Random."""
     min_words_required = 10
     max_attempts = 100
-    for _ in range(max_attempts):
-        num_vowels = random.randint(MIN_VOWELS, MAX_VOWELS)
+    start = time.perf_counter()
+    for attempt in range(1, max_attempts + 1):
+        num_vowels = rng.randint(MIN_VOWELS, MAX_VOWELS)
         num_consonants = NUM_LETTERS - num_vowels
-        vowels = random.sample(VOWELS, num_vowels)
-        consonants = random.sample(CONSONANTS, num_consonants)
+        vowels = rng.sample(VOWELS, num_vowels)
+        consonants = rng.sample(CONSONANTS, num_consonants)
         letters = vowels + consonants
-        random.shuffle(letters)
+        rng.shuffle(letters)
         letters = [l.upper() for l in letters]
         word_count = dictionary.count_possible_words(letters)
         if word_count >= min_words_required:
+            LETTERS_ATTEMPTS.observe(attempt)
+            LETTERS_SECONDS.observe(time.perf_counter() - start)
             return letters
+    LETTERS_ATTEMPTS.observe(max_attempts)
+    LETTERS_SECONDS.observe(time.perf_counter() - start)
     return list("MASTER")
 
 
@@ -43,6 +54,34 @@ def validate_submission(player, word, session):
     return True, "+%d pts for %s!" % (points, word), points
 
 
+def parse_word_batch(text):
+    """Split a typed message into words, or None if it is not a pure word batch."""
+    words = text.split()
+    # Ordinary chatter (punctuation, digits) is not a submission
+    if not words or not all(w.isalpha() for w in words):
+        return None
+    return words
+
+
+def validate_submissions(player, words, session):
+    """Validate several typed words at once.
+
+    Duplicates within the batch are checked once. Returns (total_points, messages).
+    """
+    total = 0
+    messages = []
+    seen = set()
+    for word in words[:MAX_WORDS_PER_MESSAGE]:
+        word = word.upper()
+        if word in seen:
+            continue
+        seen.add(word)
+        success, message, points = validate_submission(player, word, session)
+        total += points
+        messages.append(message)
+    return total, messages
+
+
 def format_game_message(session, player):
     lines = []
     lines.append("=== ANAGRAM GAME ===")
@@ -104,6 +143,18 @@ def format_results_message(session):
     return "\n".join(lines)
 
 
+def format_leaderboard_message(rows, title):
+    lines = []
+    lines.append("=== %s ===" % title)
+    lines.append("")
+    if not rows:
+        lines.append("No games recorded yet!")
+        return "\n".join(lines)
+    for i, (name, best, words, games) in enumerate(rows, 1):
+        lines.append("  %d. %s: best %d pts, %d words in %d games" % (i, name, best, words, games))
+    return "\n".join(lines)
+
+
 def format_waiting_message(session):
     lines = []
     lines.append("=== ANAGRAM GAME - Lobby ===")
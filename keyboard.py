@@ -4,23 +4,31 @@ Layout: all buttons in a single row
 [letter1] [letter2] ... [letter6] [backspace] [submit]
 
 When a letter is used, it shows as X. Pressing X restores that letter.
+
+Game callbacks are compact: <op><position><tag>, where op is one character,
+position is a single digit ("-" for backspace/submit) and tag is
+"<session_id>.<keyboard_version>" in hex. The tag lets the bot drop taps on a
+keyboard from a previous game or an outdated render without parsing numbers.
 """
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
-# Callback data prefixes
-CB_LETTER = "letter:"    # letter:<position>:<letter>
-CB_RESTORE = "restore:"  # restore:<position>:<letter>
-CB_BACKSPACE = "action:backspace"
-CB_SUBMIT = "action:submit"
+# Callback data ops (first character of the payload)
+CB_LETTER = "L"     # L<position><tag>
+CB_RESTORE = "R"    # R<position><tag>
+CB_BACKSPACE = "B"  # B-<tag>
+CB_SUBMIT = "S"     # S-<tag>
+CB_JOIN = "action:join"
+CB_BEGIN = "action:begin"
 
 
-def build_game_keyboard(available_letters=None, used_positions=None):
+def build_game_keyboard(available_letters=None, used_positions=None, tag=""):
     """Build keyboard with all buttons in a single row.
 
     Args:
         available_letters: list of 6 letters
         used_positions: set of positions (0-5) that have been used
+        tag: session/keyboard version tag appended to every callback
     """
     if not available_letters:
         return InlineKeyboardMarkup([])
@@ -37,18 +45,18 @@ def build_game_keyboard(available_letters=None, used_positions=None):
             # Show X, pressing it restores this letter
             row.append(
                 InlineKeyboardButton(
-                    "\u2716", callback_data="%s%d:%s" % (CB_RESTORE, i, letter)
+                    "\u2716", callback_data="%s%d%s" % (CB_RESTORE, i, tag)
                 )
             )
         else:
             # Show the letter, pressing it uses this position
             row.append(
                 InlineKeyboardButton(
-                    letter, callback_data="%s%d:%s" % (CB_LETTER, i, letter)
+                    letter, callback_data="%s%d%s" % (CB_LETTER, i, tag)
                 )
             )
-    row.append(InlineKeyboardButton("\u232b", callback_data=CB_BACKSPACE))
-    row.append(InlineKeyboardButton("\u2713", callback_data=CB_SUBMIT))
+    row.append(InlineKeyboardButton("\u232b", callback_data=CB_BACKSPACE + "-" + tag))
+    row.append(InlineKeyboardButton("\u2713", callback_data=CB_SUBMIT + "-" + tag))
 
     return InlineKeyboardMarkup([row])
 
@@ -57,7 +65,7 @@ def build_join_keyboard():
     """Build the keyboard for the multiplayer lobby."""
     return InlineKeyboardMarkup([
         [
-            InlineKeyboardButton("Join Game", callback_data="action:join"),
-            InlineKeyboardButton("Start!", callback_data="action:begin"),
+            InlineKeyboardButton("Join Game", callback_data=CB_JOIN),
+            InlineKeyboardButton("Start!", callback_data=CB_BEGIN),
         ]
     ])
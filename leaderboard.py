@@ -0,0 +1,165 @@
+"""Persistent cross-game leaderboards for the Anagram game.
+
+Per-player aggregates (best score, total words, games played) are kept per chat
+and globally in SQLite. Writes are merged in memory and flushed in batches;
+top-K queries are answered from a bounded in-memory heap per scope.
+"""
+
+import heapq
+import sqlite3
+from typing import Dict, List, Tuple
+
+from config import LEADERBOARD_PATH, LEADERBOARD_TOP_K, LEADERBOARD_BATCH_SIZE
+
+# Telegram chat ids are never 0, so it is free to use as the global scope
+GLOBAL_SCOPE = 0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS player_stats (
+    chat_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    display_name TEXT NOT NULL,
+    best_score INTEGER NOT NULL,
+    total_words INTEGER NOT NULL,
+    games_played INTEGER NOT NULL,
+    PRIMARY KEY (chat_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS player_stats_best
+    ON player_stats (chat_id, best_score DESC);
+"""
+
+_UPSERT = """
+INSERT INTO player_stats
+    (chat_id, user_id, display_name, best_score, total_words, games_played)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (chat_id, user_id) DO UPDATE SET
+    display_name = excluded.display_name,
+    best_score = MAX(best_score, excluded.best_score),
+    total_words = total_words + excluded.total_words,
+    games_played = games_played + excluded.games_played
+"""
+
+
+class _Board:
+    """Top-K players of one scope, ordered by best score.
+
+    Best scores never decrease, so a player pushed out of the heap can only
+    come back by beating the current minimum, which is checked on update.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.heap: List[Tuple[int, int]] = []  # (best_score, user_id), min at [0]
+        self.stats: Dict[int, List] = {}  # user_id -> [name, best, words, games]
+
+    def add(self, user_id, stats):
+        self.stats[user_id] = stats
+        item = (stats[1], user_id)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+        else:
+            _, dropped = heapq.heappushpop(self.heap, item)
+            del self.stats[dropped]
+
+    def qualifies(self, score):
+        return len(self.heap) < self.k or score > self.heap[0][0]
+
+    def improve(self, user_id, best):
+        """Raise the heap key of a player already on the board."""
+        self.heap = [(best if uid == user_id else s, uid) for s, uid in self.heap]
+        heapq.heapify(self.heap)
+
+    def ranked(self):
+        return [self.stats[uid] for _, uid in sorted(self.heap, reverse=True)]
+
+
+class Leaderboard:
+    """SQLite-backed leaderboard with batched writes and in-memory top-K."""
+
+    def __init__(self, path=LEADERBOARD_PATH, top_k=LEADERBOARD_TOP_K,
+                 batch_size=LEADERBOARD_BATCH_SIZE):
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_SCHEMA)
+        self._boards: Dict[int, _Board] = {}
+        # (scope, user_id) -> [name, best, words, games] not yet written
+        self._pending: Dict[Tuple[int, int], List] = {}
+
+    def record_game(self, session):
+        """Fold a finished session into the chat and global leaderboards."""
+        for player in session.players.values():
+            for scope in (session.chat_id, GLOBAL_SCOPE):
+                self._record(scope, player)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def _record(self, scope, player):
+        name, score, words = player.display_name, player.score, len(player.found_words)
+        key = (scope, player.user_id)
+        delta = self._pending.get(key)
+        if delta is None:
+            self._pending[key] = [name, score, words, 1]
+        else:
+            delta[0] = name
+            delta[1] = max(delta[1], score)
+            delta[2] += words
+            delta[3] += 1
+
+        board = self._board(scope)
+        stats = board.stats.get(player.user_id)
+        if stats is not None:
+            stats[0] = name
+            stats[2] += words
+            stats[3] += 1
+            if score > stats[1]:
+                stats[1] = score
+                board.improve(player.user_id, score)
+        elif board.qualifies(score):
+            board.add(player.user_id, self._load_player(scope, player.user_id))
+
+    def _board(self, scope):
+        board = self._boards.get(scope)
+        if board is None:
+            board = _Board(self.top_k)
+            rows = self._conn.execute(
+                "SELECT user_id, display_name, best_score, total_words, games_played "
+                "FROM player_stats WHERE chat_id = ? ORDER BY best_score DESC LIMIT ?",
+                (scope, self.top_k),
+            )
+            for user_id, name, best, words, games in rows:
+                board.add(user_id, [name, best, words, games])
+            self._boards[scope] = board
+        return board
+
+    def _load_player(self, scope, user_id):
+        """Full aggregate for one player: stored row merged with pending delta."""
+        row = self._conn.execute(
+            "SELECT display_name, best_score, total_words, games_played "
+            "FROM player_stats WHERE chat_id = ? AND user_id = ?",
+            (scope, user_id),
+        ).fetchone()
+        delta = self._pending.get((scope, user_id))
+        if row is None:
+            return list(delta)
+        if delta is None:
+            return list(row)
+        return [delta[0], max(row[1], delta[1]), row[2] + delta[2], row[3] + delta[3]]
+
+    def top(self, scope=GLOBAL_SCOPE):
+        """Return [display_name, best_score, total_words, games_played] rows, best first."""
+        return self._board(scope).ranked()
+
+    def flush(self):
+        """Write all pending aggregates in a single transaction."""
+        if not self._pending:
+            return
+        rows = [(scope, user_id, d[0], d[1], d[2], d[3])
+                for (scope, user_id), d in self._pending.items()]
+        with self._conn:
+            self._conn.executemany(_UPSERT, rows)
+        self._pending.clear()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
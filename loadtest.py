@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Synthetic load generator for the Anagram bot.
+
+Runs the real bot (bot.build_application) against fake_bot_api.FakeBotAPI in
+one process and simulates N chats with M players each. Players read their
+rack off the keyboard, pick words from the real dictionary, tap them in letter
+by letter (waiting for each edit, since stale taps are dropped) and submit.
+
+Usage: python loadtest.py --chats 20 --players 3 --words 8 --duration 30
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+from fake_bot_api import FakeBotAPI
+
+GAME_KEYBOARD_WIDTH = 8  # 6 letters + backspace + submit
+
+
+class MessageTracker:
+    """Routes messages seen by the fake API to per-chat and per-message queues."""
+
+    def __init__(self):
+        self.sent = defaultdict(asyncio.Queue)   # chat_id -> sent messages
+        self.edits = defaultdict(asyncio.Queue)  # (chat_id, message_id) -> (time, message)
+
+    def on_message(self, method, message):
+        chat_id = message["chat"]["id"]
+        if method == "sendMessage":
+            self.sent[chat_id].put_nowait(dict(message))
+        else:
+            self.edits[(chat_id, message["message_id"])].put_nowait(
+                (time.perf_counter(), dict(message)))
+
+
+class LoadStats:
+    def __init__(self):
+        self.updates = 0
+        self.words = 0
+        self.timeouts = 0
+        self.stalled_chats = 0
+        self.handler_errors = Counter()
+        self.latencies = []
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))]
+
+
+def _keyboard_row(message):
+    markup = message.get("reply_markup")
+    if not markup or not markup.get("inline_keyboard"):
+        return None
+    return markup["inline_keyboard"][0]
+
+
+async def simulate_player(api, tracker, stats, args, rng, dictionary, user, message, deadline):
+    chat_id = message["chat"]["id"]
+    edits = tracker.edits[(chat_id, message["message_id"])]
+    row = _keyboard_row(message)
+    letters = [button["text"] for button in row[:6]]
+    words = dictionary.find_possible_words(letters)
+    rng.shuffle(words)
+
+    async def tap(data):
+        nonlocal row
+        while not edits.empty():
+            row = _keyboard_row(edits.get_nowait()[1]) or row
+        await api.push_update(api.callback_update(message, user, data))
+        stats.updates += 1
+        sent = time.perf_counter()
+        try:
+            edited_at, edited = await asyncio.wait_for(edits.get(), args.timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            return True
+        stats.latencies.append(edited_at - sent)
+        row = _keyboard_row(edited)
+        if args.think:
+            await asyncio.sleep(args.think)
+        return row is not None
+
+    for word in words[:args.words]:
+        used = set()
+        for ch in word:
+            if time.monotonic() >= deadline:
+                return
+            pos = next(i for i, l in enumerate(letters) if l == ch and i not in used)
+            used.add(pos)
+            if not await tap(row[pos]["callback_data"]):
+                return
+        if not await tap(row[GAME_KEYBOARD_WIDTH - 1]["callback_data"]):
+            return
+        stats.words += 1
+
+
+async def simulate_chat(api, tracker, stats, args, rng, dictionary, index, duration):
+    chat_id = -(1000000 + index)
+    users = [{"id": index * 1000 + j + 1, "is_bot": False, "first_name": "P%d_%d" % (index, j)}
+             for j in range(args.players)]
+    sent = tracker.sent[chat_id]
+
+    async def next_sent(timeout):
+        # A 429 on sendMessage means the expected message never arrives
+        try:
+            return await asyncio.wait_for(sent.get(), timeout)
+        except asyncio.TimeoutError:
+            stats.stalled_chats += 1
+            return None
+
+    async def push(update):
+        await api.push_update(update)
+        stats.updates += 1
+
+    if args.players == 1:
+        await push(api.command_update(chat_id, users[0], "/play"))
+    else:
+        await push(api.command_update(chat_id, users[0], "/multi"))
+        lobby = await next_sent(args.timeout)
+        if lobby is None:
+            return
+        for user in users[1:]:
+            await push(api.callback_update(lobby, user, "action:join"))
+        await push(api.callback_update(lobby, users[0], "action:begin"))
+
+    # Game keyboards are sent in join order, one per player
+    keyboards = []
+    while len(keyboards) < args.players:
+        message = await next_sent(args.timeout)
+        if message is None:
+            return
+        row = _keyboard_row(message)
+        if row and len(row) == GAME_KEYBOARD_WIDTH:
+            keyboards.append(message)
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(
+        simulate_player(api, tracker, stats, args, random.Random(rng.random()),
+                        dictionary, user, message, deadline)
+        for user, message in zip(users, keyboards)
+    ))
+    while True:
+        message = await next_sent(max(0.0, deadline - time.monotonic()) + args.timeout)
+        if message is None or message["text"].startswith("=== GAME OVER"):
+            break
+
+
+async def run(args):
+    # Configure the bot before it is imported
+    os.environ["GAME_DURATION"] = str(args.duration)
+    os.environ.setdefault("LEADERBOARD_PATH", ":memory:")
+    os.environ.setdefault("METRICS_PORT", "0")
+    import bot
+    from config import GAME_DURATION
+    from dictionary import dictionary
+
+    api = FakeBotAPI(args.chat_rate, args.chat_burst, args.group_rate, args.group_burst,
+                     args.global_rate, args.global_burst)
+    tracker = MessageTracker()
+    api.add_listener(tracker.on_message)
+    port = await api.start()
+    app = bot.build_application("1:LOADTEST", "http://127.0.0.1:%d/bot" % port)
+    stats = LoadStats()
+
+    async def count_error(update, context):
+        # Exceptions escaping bot handlers or jobs, e.g. RetryAfter on a 429
+        stats.handler_errors[type(context.error).__name__] += 1
+
+    app.add_error_handler(count_error)
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+
+    async with app:
+        await app.start()
+        await app.updater.start_polling(poll_interval=0.0, timeout=10)
+        calls_before = sum(api.calls.values()) - api.calls["getUpdates"]
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            simulate_chat(api, tracker, stats, args, rng, dictionary, i, GAME_DURATION)
+            for i in range(args.chats)
+        ))
+        elapsed = time.perf_counter() - start
+        calls = sum(api.calls.values()) - api.calls["getUpdates"] - calls_before
+        await app.updater.stop()
+        await app.stop()
+    await api.stop()
+
+    print("chats=%d players=%d elapsed=%.1fs" % (args.chats, args.players, elapsed))
+    print("updates: %d (%.1f/s)" % (stats.updates, stats.updates / elapsed))
+    print("tap-to-edit: p50=%.1fms p99=%.1fms over %d taps, %d timeouts" % (
+        stats.percentile(50) * 1000, stats.percentile(99) * 1000,
+        len(stats.latencies), stats.timeouts))
+    print("words submitted: %d, API calls per word: %.2f" % (
+        stats.words, calls / stats.words if stats.words else 0.0))
+    print("API calls: %s" % dict(api.calls))
+    print("429s: %s, chats stalled by lost messages: %d" % (
+        dict(api.rate_limited), stats.stalled_chats))
+    print("bot handler errors: %s" % (dict(stats.handler_errors) or "none"))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the bot against a fake Bot API")
+    parser.add_argument("--chats", type=int, default=3)
+    parser.add_argument("--players", type=int, default=2, help="players per chat")
+    parser.add_argument("--words", type=int, default=10, help="words per player")
+    parser.add_argument("--duration", type=int, default=30, help="game length in seconds")
+    parser.add_argument("--think", type=float, default=0.0, help="pause after each edit (s)")
+    parser.add_argument("--timeout", type=float, default=5.0, help="max wait for an edit (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    # Defaults follow Telegram's documented bot limits
+    parser.add_argument("--chat-rate", type=float, default=1.0, help="messages/s per chat")
+    parser.add_argument("--chat-burst", type=int, default=10)
+    parser.add_argument("--group-rate", type=float, default=20 / 60.0,
+                        help="messages/s per group chat")
+    parser.add_argument("--group-burst", type=int, default=20)
+    parser.add_argument("--global-rate", type=float, default=30.0, help="messages/s overall")
+    parser.add_argument("--global-burst", type=int, default=30)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    stats = asyncio.run(run(args))
+    if not stats.latencies:
+        print("WARNING: no taps were measured; the games never started. "
+              "Check the 429 and handler error counts, or loosen the rate limits.",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
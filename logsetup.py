@@ -0,0 +1,106 @@
+"""Non-blocking logging setup for the Anagram bot.
+
+Handlers on the event loop only resolve the message and enqueue LogRecords; a
+QueueListener thread does formatting, token redaction and file/stream I/O. Records logged with
+extra={"sampled": True} (per-tap events) are kept 1 in LOG_SAMPLE_EVERY before
+they are enqueued. Structured fields passed through extra (chat_id, user_id,
+action, latency_ms) are appended as key=value pairs, or emitted as JSON with
+LOG_FORMAT=json.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import re
+from logging.handlers import QueueHandler, QueueListener
+
+from config import BOT_TOKEN, LOG_LEVEL, LOG_FILE, LOG_FORMAT, LOG_SAMPLE_EVERY
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+FIELDS = ("chat_id", "user_id", "action", "latency_ms")
+# Bot API tokens look like <bot id>:<35 url-safe characters>
+TOKEN_RE = re.compile(r"\d{5,}:[A-Za-z0-9_-]{30,}")
+
+
+def redact(text, secrets=()):
+    for secret in secrets:
+        text = text.replace(secret, "<token>")
+    return TOKEN_RE.sub("<token>", text)
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats text or JSON lines with structured fields and redacted tokens."""
+
+    def __init__(self, json_lines=False, secrets=()):
+        super().__init__(TEXT_FORMAT)
+        self.json_lines = json_lines
+        self.secrets = tuple(s for s in secrets if s)
+
+    def format(self, record):
+        fields = {k: getattr(record, k) for k in FIELDS if hasattr(record, k)}
+        if self.json_lines:
+            entry = {"ts": self.formatTime(record), "logger": record.name,
+                     "level": record.levelname, "msg": record.getMessage()}
+            entry.update(fields)
+            if record.exc_info:
+                entry["exc"] = self.formatException(record.exc_info)
+            text = json.dumps(entry, default=str)
+        else:
+            text = super().format(record)
+            if fields:
+                text += " [%s]" % " ".join("%s=%s" % kv for kv in fields.items())
+        return redact(text, self.secrets)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps one in every N records marked sampled; others pass through."""
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = max(1, every)
+        self._seen = 0
+
+    def filter(self, record):
+        if not getattr(record, "sampled", False):
+            return True
+        self._seen += 1
+        return self._seen % self.every == 1 or self.every == 1
+
+
+class _EnqueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting and redaction to the listener thread.
+
+    Only msg % args is resolved here, so mutable arguments are captured as they
+    were when logged. The stock prepare() would also format the full line and
+    traceback on the calling thread.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging():
+    """Route the root logger through a background queue listener. Returns it."""
+    if LOG_FILE:
+        target = logging.FileHandler(LOG_FILE, encoding="utf-8")
+    else:
+        target = logging.StreamHandler()
+    target.setFormatter(StructuredFormatter(LOG_FORMAT == "json", secrets=(BOT_TOKEN,)))
+
+    records = queue.SimpleQueue()
+    handler = _EnqueueHandler(records)
+    handler.addFilter(SamplingFilter(LOG_SAMPLE_EVERY))
+    listener = QueueListener(records, target, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(LOG_LEVEL.upper())
+    # httpx logs every request URL (token included) at INFO, once per poll
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
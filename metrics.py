@@ -0,0 +1,169 @@
+"""In-process metrics for the Anagram bot, exported in Prometheus text format.
+
+Recording is a dict lookup plus a few additions on the event loop thread; the
+optional HTTP endpoint renders a snapshot from its own daemon thread.
+"""
+
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY: List["_Metric"] = []
+
+
+def _format_labels(names, values, extra=""):
+    pairs = ['%s="%s"' % (n, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+             for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{%s}" % ",".join(pairs) if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = ["# HELP %s %s" % (self.name, self.help),
+                 "# TYPE %s %s" % (self.name, self.kind)]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labelvalues, amount=1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        return ["%s%s %s" % (self.name, _format_labels(self.labelnames, k), v)
+                for k, v in list(self._values.items())]
+
+
+class Gauge(_Metric):
+    """Gauge set directly, or computed at scrape time by a collect function.
+
+    A collect function returns {labelvalues: value} and costs nothing between
+    scrapes.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._collect: Optional[Callable[[], Dict[Tuple, float]]] = None
+
+    def set(self, value, *labelvalues):
+        self._values[labelvalues] = value
+
+    def set_function(self, collect):
+        self._collect = collect
+
+    def samples(self):
+        values = self._collect() if self._collect else self._values
+        return ["%s%s %s" % (self.name, _format_labels(self.labelnames, k), v)
+                for k, v in list(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # labelvalues -> [per-bucket counts (last is +Inf), sum, count]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value, *labelvalues):
+        entry = self._values.get(labelvalues)
+        if entry is None:
+            entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def samples(self):
+        lines = []
+        bounds = [repr(float(b)) for b in self.buckets] + ["+Inf"]
+        for labelvalues, (counts, total, count) in list(self._values.items()):
+            cumulative = 0
+            for bound, n in zip(bounds, list(counts)):
+                cumulative += n
+                lines.append("%s_bucket%s %d" % (
+                    self.name, _format_labels(self.labelnames, labelvalues, 'le="%s"' % bound),
+                    cumulative))
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append("%s_sum%s %s" % (self.name, labels, total))
+            lines.append("%s_count%s %d" % (self.name, labels, count))
+        return lines
+
+
+def render_all():
+    return "\n".join(m.render() for m in REGISTRY) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render_all().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics on a daemon thread. Returns the server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics", daemon=True)
+    thread.start()
+    return server
+
+
+# Bot metrics
+CALLBACK_LATENCY = Histogram(
+    "anagram_callback_seconds", "Callback handling latency by action", ["action"])
+CALLBACKS_DROPPED = Counter(
+    "anagram_callbacks_dropped_total", "Callbacks dropped before dispatch", ["reason"])
+API_LATENCY = Histogram(
+    "anagram_bot_api_seconds", "Bot API call latency by method", ["method"])
+API_ERRORS = Counter(
+    "anagram_bot_api_errors_total", "Failed Bot API calls by method", ["method"])
+API_RATE_LIMITED = Counter(
+    "anagram_bot_api_429_total", "Bot API calls rejected with 429 by method", ["method"])
+LETTERS_ATTEMPTS = Histogram(
+    "anagram_generate_letters_attempts", "Racks drawn per generate_letters call",
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100))
+LETTERS_SECONDS = Histogram(
+    "anagram_generate_letters_seconds", "generate_letters duration")
+FIND_WORDS_SECONDS = Histogram(
+    "anagram_find_possible_words_seconds", "find_possible_words duration")
+ACTIVE_SESSIONS = Gauge(
+    "anagram_active_sessions", "Active game sessions by state", ["state"])
+SESSION_PLAYERS = Histogram(
+    "anagram_session_players", "Players per started session",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 32))
@@ -1,5 +1,7 @@
 """Data models for the Anagram game."""
 
+import itertools
+import random
 import time
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Set
@@ -7,6 +9,10 @@ from enum import Enum
 
 from config import GAME_DURATION, SCORE_MAP
 
+# Process-wide session ids, used to tell keyboards of different games apart.
+# Randomly seeded so keyboards left over from before a restart never match.
+_session_ids = itertools.count(random.getrandbits(32))
+
 
 class GameMode(Enum):
     SOLO = "solo"
@@ -31,6 +37,8 @@ class Player:
     last_action: str = ""
     used_positions: Set[int] = field(default_factory=set)
     input_positions: List[int] = field(default_factory=list)
+    keyboard_version: int = 0
+    keyboard_tag: str = ""
 
     def add_word(self, word):
         word = word.upper()
@@ -64,6 +72,12 @@ class Player:
             self.used_positions.add(position)
             self.input_positions.append(position)
 
+    def next_keyboard_tag(self, session_id):
+        """Bump the keyboard version and return the tag embedded in its callbacks."""
+        self.keyboard_version += 1
+        self.keyboard_tag = "%x.%x" % (session_id, self.keyboard_version)
+        return self.keyboard_tag
+
     def restore_position(self, position):
         """Restore a used position (press X to undo)."""
         if position in self.used_positions:
@@ -84,6 +98,7 @@ class GameSession:
     start_time: float = 0.0
     host_user_id: int = 0
     possible_words: List[str] = field(default_factory=list)
+    session_id: int = field(default_factory=lambda: next(_session_ids))
 
     def add_player(self, user_id, username, display_name):
         if user_id not in self.players:
@@ -0,0 +1,87 @@
+"""Opt-in sampling profiler for the bot's event-loop thread.
+
+A daemon thread samples the loop thread's stack at a fixed rate for a bounded
+window and writes collapsed stacks ("tag;frame;frame count" per line) that
+flamegraph.pl, speedscope or inferno can read. Each sample is tagged with the
+innermost bot.py handler on the stack. Nothing runs while no window is open.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+HANDLER_PREFIXES = ("cmd_", "handle_")
+HANDLER_NAMES = ("timer_callback", "end_game", "flush_stores")
+
+
+def _frame_label(code):
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return "%s.%s" % (module, code.co_name)
+
+
+def collapse(frame):
+    """Return the collapsed stack for frame, tagged by its bot.py handler."""
+    labels = []
+    tag = None
+    while frame is not None:
+        code = frame.f_code
+        labels.append(_frame_label(code))
+        if tag is None and os.path.basename(code.co_filename) == "bot.py" and (
+                code.co_name.startswith(HANDLER_PREFIXES) or code.co_name in HANDLER_NAMES):
+            tag = code.co_name
+        frame = frame.f_back
+    labels.append(tag or "idle")
+    labels.reverse()
+    return ";".join(labels)
+
+
+class SamplingProfiler:
+    """Samples one thread's stack for a bounded window."""
+
+    def __init__(self, thread_id, rate_hz, duration, out_path):
+        self.thread_id = thread_id
+        self.interval = 1.0 / max(1, rate_hz)
+        self.duration = duration
+        self.out_path = out_path
+        self.samples: Counter = Counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def _run(self):
+        deadline = time.monotonic() + self.duration
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[collapse(frame)] += 1
+            del frame
+            time.sleep(self.interval)
+        self._write()
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.out_path) or ".", exist_ok=True)
+        with open(self.out_path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write("%s %d\n" % (stack, count))
+
+
+_active: Optional[SamplingProfiler] = None
+
+
+def start_profiling(thread_id, rate_hz, duration, out_dir):
+    """Open a profiling window. Returns the output path, or None if one is running."""
+    global _active
+    if _active is not None and _active.running:
+        return None
+    out_path = os.path.join(out_dir, "profile-%s.folded" % time.strftime("%Y%m%d-%H%M%S"))
+    _active = SamplingProfiler(thread_id, rate_hz, duration, out_path)
+    _active.start()
+    return out_path
@@ -0,0 +1,45 @@
+"""Inbound flood control for callback queries."""
+
+import time
+from typing import Dict, Hashable, List
+
+
+class RateLimiter:
+    """Token bucket per key with idle-key eviction.
+
+    Each active key holds a fixed [tokens, last_seen] pair. Keys idle for longer
+    than idle_timeout have a full bucket again, so they are dropped on the next
+    sweep without changing behaviour.
+    """
+
+    def __init__(self, rate: float, burst: int, idle_timeout: float = 60.0):
+        self.rate = rate
+        self.burst = burst
+        self.idle_timeout = max(idle_timeout, burst / rate)
+        self._buckets: Dict[Hashable, List[float]] = {}
+        self._next_sweep = time.monotonic() + self.idle_timeout
+
+    def allow(self, key: Hashable) -> bool:
+        """Take one token for key. Returns False if the key is over its limit."""
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = [self.burst - 1, now]
+            return True
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return False
+        bucket[0] = tokens - 1
+        return True
+
+    def _sweep(self, now):
+        cutoff = now - self.idle_timeout
+        self._buckets = {k: b for k, b in self._buckets.items() if b[1] >= cutoff}
+        self._next_sweep = now + self.idle_timeout
+
+    def __len__(self):
+        return len(self._buckets)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Record and replay the bot's inbound update stream.
+
+Recording (RECORD_UPDATES=<path> when running bot.py) appends one line per
+inbound update or game timer:
+
+    <ms since previous>\t<kind>\t<chat>\t<user>\t<payload>
+
+kind is "c" (callback), "m" (command or typed word batch), "t" (game timer
+fired) or "r" (start of a recording run; the payload is its start time). Chat
+and user ids are replaced by small sequential numbers, numbered afresh in each
+run, so read_records keeps the runs apart. Game callbacks keep only
+<op><position>, plus "~" when the tap hit a stale keyboard, so replay can
+re-tag them against its own sessions.
+
+Replay drives the bot.py handlers directly with a stub bot, at recorded speed
+or as fast as possible, with a seeded rack generator:
+
+    python replay.py updates.rec --fast --seed 1 --max-p99-ms 5
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+STALE_MARK = "~"
+# Ids of later runs in one file are shifted by this much to keep runs apart
+RUN_ID_SPAN = 10 ** 9
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def _unescape(text):
+    out = []
+    chars = iter(text)
+    for ch in chars:
+        if ch == "\\":
+            ch = {"t": "\t", "n": "\n"}.get(next(chars, ""), "\\")
+        out.append(ch)
+    return "".join(out)
+
+
+class UpdateRecorder:
+    """Append-only writer for the compact update log."""
+
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+        self._last = None
+        self._chats = {}
+        self._users = {}
+        self._file.write("0\tr\t0\t0\t%d\n" % int(time.time()))
+
+    @staticmethod
+    def _anonymize(ids, real_id):
+        anon = ids.get(real_id)
+        if anon is None:
+            anon = ids[real_id] = len(ids) + 1
+        return anon
+
+    def record(self, kind, chat_id, user_id, payload=""):
+        now = time.monotonic()
+        delta = 0 if self._last is None else int((now - self._last) * 1000)
+        self._last = now
+        self._file.write("%d\t%s\t%d\t%d\t%s\n" % (
+            delta, kind, self._anonymize(self._chats, chat_id),
+            self._anonymize(self._users, user_id) if user_id else 0, _escape(payload)))
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def read_records(path):
+    """Yield (delta_seconds, kind, chat, user, payload) from a recording.
+
+    Each run's ids are offset by RUN_ID_SPAN so runs appended to the same file
+    never share chats or users.
+    """
+    run = -1
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            delta, kind, chat, user, payload = line.rstrip("\n").split("\t", 4)
+            if kind == "r":
+                run += 1
+            offset = max(run, 0) * RUN_ID_SPAN
+            chat, user = int(chat), int(user)
+            yield (int(delta) / 1000.0, kind, chat + offset if chat else 0,
+                   user + offset if user else 0, _unescape(payload))
+
+
+# Replay stubs
+
+class StubBot:
+    """Accepts Bot API calls without doing I/O and counts them by method."""
+
+    def __init__(self):
+        self.calls = {}
+        self._message_ids = itertools.count(1)
+
+    def _count(self, method):
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+    async def send_message(self, chat_id, text, reply_markup=None, **kwargs):
+        self._count("sendMessage")
+        return SimpleNamespace(message_id=next(self._message_ids))
+
+    async def edit_message_text(self, text=None, chat_id=None, message_id=None, **kwargs):
+        self._count("editMessageText")
+        return True
+
+
+class StubJobQueue:
+    """Game timers are replayed from "t" records, so scheduling is a no-op."""
+
+    def run_once(self, callback, when, data=None, name=None):
+        return None
+
+    def run_repeating(self, callback, interval, **kwargs):
+        return None
+
+
+class _Unlimited:
+    def allow(self, key):
+        return True
+
+
+def _user(user_id):
+    return SimpleNamespace(id=user_id, first_name="User%d" % user_id, last_name=None,
+                           username=None)
+
+
+def _query(stub, data):
+    async def answer(text=None, **kwargs):
+        stub._count("answerCallbackQuery")
+
+    async def edit_message_text(text, reply_markup=None, **kwargs):
+        stub._count("editMessageText")
+
+    return SimpleNamespace(data=data, answer=answer, edit_message_text=edit_message_text)
+
+
+def _message(stub, chat_id, text):
+    async def reply_text(text, reply_markup=None, **kwargs):
+        return await stub.send_message(chat_id, text, reply_markup=reply_markup)
+
+    return SimpleNamespace(text=text, reply_text=reply_text)
+
+
+async def replay(path, fast=False, seed=0):
+    """Replay a recording. Returns (elapsed, handler latencies, stub bot)."""
+    os.environ.setdefault("LEADERBOARD_PATH", ":memory:")
+    import bot
+
+    stub = StubBot()
+    job_queue = StubJobQueue()
+    bot.letters_rng = random.Random(seed)
+    if fast:
+        bot.user_tap_limiter = bot.chat_tap_limiter = _Unlimited()
+    commands = {
+        "start": bot.cmd_start, "help": bot.cmd_help, "play": bot.cmd_play,
+        "multi": bot.cmd_multi, "top": bot.cmd_top,
+    }
+
+    latencies = []
+    start = due = time.perf_counter()
+    for delta, kind, chat_id, user_id, payload in read_records(path):
+        due += delta
+        if not fast and due > time.perf_counter():
+            await asyncio.sleep(due - time.perf_counter())
+        if kind == "r":
+            # The bot restarted here: games in flight were lost with it
+            bot.active_games.clear()
+            continue
+        # Recordings do not keep the chat type; only the help text depends on it
+        chat = SimpleNamespace(id=chat_id, type="group")
+        context = SimpleNamespace(bot=stub, job_queue=job_queue, args=[], job=None)
+        began = time.perf_counter()
+        if kind == "t":
+            context.job = SimpleNamespace(data=chat_id)
+            await bot.timer_callback(context)
+        elif kind == "c":
+            data = payload
+            if len(data) == 2:
+                # A tap on the current keyboard: re-tag it for this replay
+                session = bot.active_games.get(chat_id)
+                player = session.get_player(user_id) if session else None
+                data += player.keyboard_tag if player else STALE_MARK
+            update = SimpleNamespace(callback_query=_query(stub, data), effective_chat=chat,
+                                     effective_user=_user(user_id), message=None)
+            await bot.handle_callback(update, context)
+        else:
+            update = SimpleNamespace(callback_query=None, effective_chat=chat,
+                                     effective_user=_user(user_id),
+                                     message=_message(stub, chat_id, payload))
+            if payload.startswith("/"):
+                words = payload[1:].split()
+                handler = commands.get(words[0].split("@")[0]) if words else None
+                if handler is None:
+                    continue
+                context.args = words[1:]
+                await handler(update, context)
+            elif bot.TEXT_INPUT_ENABLED:
+                await bot.handle_text(update, context)
+        latencies.append(time.perf_counter() - began)
+    return time.perf_counter() - start, latencies, stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded update stream")
+    parser.add_argument("path")
+    parser.add_argument("--fast", action="store_true", help="ignore recorded timing")
+    parser.add_argument("--seed", type=int, default=0, help="rack generator seed")
+    parser.add_argument("--max-p99-ms", type=float, default=0.0,
+                        help="exit 1 if the p99 handler latency exceeds this")
+    args = parser.parse_args()
+
+    elapsed, latencies, stub = asyncio.run(replay(args.path, args.fast, args.seed))
+    ordered = sorted(latencies) or [0.0]
+    p50 = ordered[len(ordered) // 2] * 1000
+    p99 = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] * 1000
+    print("replayed %d records in %.2fs (%.0f/s)" % (
+        len(latencies), elapsed, len(latencies) / elapsed if elapsed else 0.0))
+    print("handler latency: p50=%.3fms p99=%.3fms max=%.3fms" % (p50, p99, ordered[-1] * 1000))
+    print("stub API calls: %s" % stub.calls)
+    if args.max_p99_ms and p99 > args.max_p99_ms:
+        print("FAIL: p99 %.3fms > %.3fms" % (p99, args.max_p99_ms))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()